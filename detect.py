@@ -1,6 +1,11 @@
 import numpy as np
 from numpy.typing import ArrayLike
 from processing.convert import bgr_to_hsv
+from processing.masks import (
+    extract_masks,
+    TEXTFACE_SIZE_TOLERANCES,
+    LOGO_SIZE_TOLERANCES,
+)
 from processing.labels import (
     ccl,
     label_uniques,
@@ -26,9 +31,7 @@ def detect(image: ArrayLike) -> ArrayLike:
     hsv_image = bgr_to_hsv(image.astype(np.float32) / 255)
 
     # Extract face, text & contour masks
-    face_mask = (hsv_image[:, :, 1] < 0.15) & (hsv_image[:, :, 2] > 0.5)
-    text_mask = (hsv_image[:, :, 0] < 0.2) & (hsv_image[:, :, 0] > 0.095)
-    contour_mask = hsv_image[:, :, 2] < 0.4
+    face_mask, text_mask, contour_mask = extract_masks(hsv_image)
 
     # Erode and dilate text mask
     text_mask = dilate(erode(text_mask, 2), 4)
@@ -46,7 +49,7 @@ def detect(image: ArrayLike) -> ArrayLike:
     text_cogs = label_cogs(text_labels, text_uniques, text_sizes)
 
     # Compare sizes and relative positions between text and face labels
-    textface_size_mask = similar_sizes(text_sizes, face_sizes, (0.5, 1.25))
+    textface_size_mask = similar_sizes(text_sizes, face_sizes, TEXTFACE_SIZE_TOLERANCES)
     textface_pos_mask = relative_positions(
         text_sizes,
         text_cogs,
@@ -71,7 +74,7 @@ def detect(image: ArrayLike) -> ArrayLike:
     contour_cogs = label_cogs(contour_labels, contour_uniques, contour_sizes)
 
     # Compare relative positions between textface and contour labels
-    logo_size_mask = similar_sizes(textface_sizes, contour_sizes, (0.075, 2.0))
+    logo_size_mask = similar_sizes(textface_sizes, contour_sizes, LOGO_SIZE_TOLERANCES)
     logo_pos_mask = relative_positions(
         textface_sizes,
         textface_cogs,
@@ -6,6 +6,14 @@ from argparse import ArgumentParser
 from threading import Thread
 from show import imsshow
 from datetime import datetime
+from functools import partial
+from processing.prefilter import (
+    may_contain_logo,
+    PrefilterStats,
+    DEFAULT_MIN_FRACTION,
+    DEFAULT_SLACK,
+    DEFAULT_MAX_SIDE,
+)
 
 
 def print_progress(current: int, total: int, name: str):
@@ -15,7 +23,28 @@ def print_progress(current: int, total: int, name: str):
     print(f"Processed {current}/{total}: {name}")
 
 
-def main(source_folder: str, destination_folder: str, preview: int):
+def print_prefilter_stats(stats: PrefilterStats):
+    """
+    Displays how many images the prefilter skipped and how much time it saved.
+    """
+    saved_seconds = stats.saved_seconds()
+    saved = "unknown" if saved_seconds is None else f"~{saved_seconds:.2f}s"
+    print(
+        f"Prefilter skipped {stats.skipped}/{stats.checked} images, "
+        f"spent {stats.prefilter_seconds:.2f}s, "
+        f"saved {saved}"
+    )
+
+
+def main(
+    source_folder: str,
+    destination_folder: str,
+    preview: int,
+    prefilter: bool = False,
+    prefilter_fraction: float = DEFAULT_MIN_FRACTION,
+    prefilter_slack: float = DEFAULT_SLACK,
+    prefilter_size: int = DEFAULT_MAX_SIDE,
+):
     """
     Main application.
     """
@@ -24,8 +53,19 @@ def main(source_folder: str, destination_folder: str, preview: int):
         datetime.now().strftime("%Y_%m_%d__%H_%M_%S")
     )
 
+    # Optional cheap check which skips images that cannot contain a logo
+    stats = PrefilterStats()
+    check = None
+    if prefilter:
+        check = partial(
+            may_contain_logo,
+            min_fraction=prefilter_fraction,
+            slack=prefilter_slack,
+            max_side=prefilter_size,
+        )
+
     # Generator which performs detection on each `next` call
-    total, progress = process_all(source_folder, destination_folder)
+    total, progress = process_all(source_folder, destination_folder, check, stats)
 
     # Collects first preview images for display
     if preview > 0:
@@ -42,6 +82,9 @@ def main(source_folder: str, destination_folder: str, preview: int):
     for current, destination in enumerate(progress):
         print_progress(1 + preview + current, total, destination)
 
+    if prefilter:
+        print_prefilter_stats(stats)
+
     # Awaits preview display to stop.
     if preview > 0:
         show_handle.join()
@@ -65,5 +108,36 @@ if __name__ == "__main__":
         type=int,
         help="How many first images to preview during processing.",
     )
+    parser.add_argument(
+        "--prefilter",
+        action="store_true",
+        help="Skip images which cannot contain a logo based on a thumbnail check.",
+    )
+    parser.add_argument(
+        "--prefilter-fraction",
+        default=DEFAULT_MIN_FRACTION,
+        type=float,
+        help="Smallest plausible logo area as a fraction of the image. Lower increases recall.",
+    )
+    parser.add_argument(
+        "--prefilter-slack",
+        default=DEFAULT_SLACK,
+        type=float,
+        help="Loosens prefilter size proportions. Higher increases recall.",
+    )
+    parser.add_argument(
+        "--prefilter-size",
+        default=DEFAULT_MAX_SIDE,
+        type=int,
+        help="Longer side of the prefilter thumbnail, masks are pooled into it. Lower increases recall.",
+    )
     args = parser.parse_args()
-    main(args.source_folder, args.destination_folder, args.preview)
+    main(
+        args.source_folder,
+        args.destination_folder,
+        args.preview,
+        args.prefilter,
+        args.prefilter_fraction,
+        args.prefilter_slack,
+        args.prefilter_size,
+    )
@@ -1,20 +1,47 @@
 from cv2 import imread, imwrite
 from pathlib import Path
 from os import makedirs
-from typing import Tuple, List, Generator
+from typing import Tuple, List, Generator, Callable, Optional
 from detect import detect
 from shutil import rmtree
+from time import perf_counter
+from processing.prefilter import PrefilterStats
 
 
-def process_one(source: Path, destination: Path) -> Path:
+def process_one(
+    source: Path,
+    destination: Path,
+    prefilter: Optional[Callable] = None,
+    stats: Optional[PrefilterStats] = None,
+) -> Path:
     """
     Load, performs detection and saves a single image.
+    When prefilter rejects the image, detection is skipped and the image is saved unchanged.
     """
     assert source.is_file()
     assert not destination.exists()
 
     image = imread(str(source))
+    pixels = image.shape[0] * image.shape[1]
+
+    if prefilter is not None:
+        start = perf_counter()
+        accepted = prefilter(image)
+        if stats is not None:
+            stats.checked += 1
+            stats.prefilter_seconds += perf_counter() - start
+        if not accepted:
+            if stats is not None:
+                stats.skipped += 1
+                stats.skipped_pixels += pixels
+            imwrite(str(destination), image)
+            return destination
+
+    start = perf_counter()
     images = detect(image)
+    if stats is not None:
+        stats.detect_seconds += perf_counter() - start
+        stats.detected_pixels += pixels
     for i, image in enumerate(images):
         if i == 0:
             imwrite(str(destination), image)
@@ -26,16 +53,21 @@ def process_one(source: Path, destination: Path) -> Path:
 
 def process_many(
     sources_and_destinations: List[Tuple[Path, Path]],
+    prefilter: Optional[Callable] = None,
+    stats: Optional[PrefilterStats] = None,
 ) -> Generator[Path, None, None]:
     """
     Load, performs detection and saves many images.
     """
     for source, destination in sources_and_destinations:
-        yield process_one(source, destination)
+        yield process_one(source, destination, prefilter, stats)
 
 
 def process_all(
-    source_folder: Path, destination_folder: Path
+    source_folder: Path,
+    destination_folder: Path,
+    prefilter: Optional[Callable] = None,
+    stats: Optional[PrefilterStats] = None,
 ) -> Tuple[int, Generator[Path, None, None]]:
     """
     Load, performs detection and saves all images from source folder into the destination folder.
@@ -53,4 +85,7 @@ def process_all(
         ]
     )
 
-    return (len(sources_and_destinations), process_many(sources_and_destinations))
+    return (
+        len(sources_and_destinations),
+        process_many(sources_and_destinations, prefilter, stats),
+    )
@@ -0,0 +1,18 @@
+from numpy.typing import ArrayLike
+from typing import Tuple
+
+# Size tolerances of face relative to text labels
+TEXTFACE_SIZE_TOLERANCES = (0.5, 1.25)
+
+# Size tolerances of contour relative to textface labels
+LOGO_SIZE_TOLERANCES = (0.075, 2.0)
+
+
+def extract_masks(hsv_image: ArrayLike) -> Tuple[ArrayLike, ArrayLike, ArrayLike]:
+    """
+    Thresholds a HSV image into face, text and contour masks.
+    """
+    face_mask = (hsv_image[:, :, 1] < 0.15) & (hsv_image[:, :, 2] > 0.5)
+    text_mask = (hsv_image[:, :, 0] < 0.2) & (hsv_image[:, :, 0] > 0.095)
+    contour_mask = hsv_image[:, :, 2] < 0.4
+    return face_mask, text_mask, contour_mask
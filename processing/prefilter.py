@@ -0,0 +1,139 @@
+import numpy as np
+from numpy.typing import ArrayLike
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from processing.convert import bgr_to_hsv
+from processing.morph import dilate
+from processing.masks import (
+    extract_masks,
+    TEXTFACE_SIZE_TOLERANCES,
+    LOGO_SIZE_TOLERANCES,
+)
+
+# Dilation radius applied to the text mask by the detection pipeline
+TEXT_DILATION = 4
+
+# Masks are sampled at most this sparsely, text surviving the pipeline's erosion is at least this wide
+SAMPLE_STRIDE = 4
+
+# Default smallest plausible logo area as a fraction of the image
+DEFAULT_MIN_FRACTION = 0.002
+
+# Default loosening of the size tolerances
+DEFAULT_SLACK = 2.0
+
+# Default longer side of the thumbnail
+DEFAULT_MAX_SIDE = 64
+
+
+def thumbnail_stride(image: ArrayLike, max_side: int = DEFAULT_MAX_SIDE) -> int:
+    """
+    Smallest stride which brings the longer side of an image to at most MAX_SIDE.
+    Strides above SAMPLE_STRIDE are rounded up to its multiple, so sampled masks can be pooled into the thumbnail.
+    """
+    stride = max(1, -(-max(image.shape[0], image.shape[1]) // max_side))
+    if stride > SAMPLE_STRIDE:
+        stride = -(-stride // SAMPLE_STRIDE) * SAMPLE_STRIDE
+    return stride
+
+
+def pool(mask: ArrayLike, factor: int) -> ArrayLike:
+    """
+    Downsamples a mask by FACTOR, entry is True when any entry within its square is True.
+    """
+    width, height = mask.shape
+    padded_mask = np.pad(
+        mask, [[0, -width % factor], [0, -height % factor]], "constant"
+    )
+    blocks = padded_mask.reshape(
+        padded_mask.shape[0] // factor, factor, padded_mask.shape[1] // factor, factor
+    )
+    return blocks.any(axis=(1, 3))
+
+
+def thumbnail_masks(
+    image: ArrayLike, max_side: int = DEFAULT_MAX_SIDE
+) -> Tuple[ArrayLike, ArrayLike, ArrayLike]:
+    """
+    Face, text and contour masks of a thumbnail with longer side of at most MAX_SIDE.
+    Masks are sampled every SAMPLE_STRIDE pixels and pooled, so thin features do not fall between thumbnail pixels.
+    """
+    stride = thumbnail_stride(image, max_side)
+    sample_stride = min(stride, SAMPLE_STRIDE)
+    sample = image[::sample_stride, ::sample_stride]
+    hsv_image = bgr_to_hsv(sample.astype(np.float32) / 255)
+    masks = extract_masks(hsv_image)
+    if stride == sample_stride:
+        return masks
+    return tuple(pool(mask, stride // sample_stride) for mask in masks)
+
+
+def plausible_logo_size(
+    face_size: int, text_size: int, contour_size: int, slack: float = DEFAULT_SLACK
+) -> float:
+    """
+    Upper bound of the logo size given total face, text and contour mask sizes.
+    Uses the same size tolerances as the detection pipeline, loosened by SLACK.
+    """
+    face_min, face_max = TEXTFACE_SIZE_TOLERANCES
+    contour_min, _ = LOGO_SIZE_TOLERANCES
+
+    # Text part is limited by its own size and by how much face can accompany it
+    text_part = min(text_size, face_size * slack / face_min)
+    face_part = min(face_size, text_part * face_max * slack)
+    textface_part = text_part + face_part
+
+    # Textface part is limited by how much contour can accompany it
+    return min(textface_part, contour_size * slack / contour_min)
+
+
+def may_contain_logo(
+    image: ArrayLike,
+    min_fraction: float = DEFAULT_MIN_FRACTION,
+    slack: float = DEFAULT_SLACK,
+    max_side: int = DEFAULT_MAX_SIDE,
+) -> bool:
+    """
+    Cheap check on a thumbnail whether the image can contain a logo at all.
+    Rejects images where face, text and contour masks cannot form a logo
+    covering at least MIN_FRACTION of the image.
+    Lower MIN_FRACTION, higher SLACK or lower MAX_SIDE trade speed for recall.
+    """
+    stride = thumbnail_stride(image, max_side)
+    face_mask, text_mask, contour_mask = thumbnail_masks(image, max_side)
+
+    # Dilating without the preceding erosion bounds the text mask the pipeline sees
+    text_mask = dilate(text_mask, -(-TEXT_DILATION // stride))
+
+    logo_size = plausible_logo_size(
+        np.count_nonzero(face_mask),
+        np.count_nonzero(text_mask),
+        np.count_nonzero(contour_mask),
+        slack,
+    )
+    return logo_size > 0 and logo_size >= min_fraction * face_mask.size
+
+
+@dataclass
+class PrefilterStats:
+    """
+    Counters of the prefilter stage.
+    """
+
+    checked: int = 0
+    skipped: int = 0
+    prefilter_seconds: float = 0.0
+    detect_seconds: float = 0.0
+    detected_pixels: int = 0
+    skipped_pixels: int = 0
+
+    def saved_seconds(self) -> Optional[float]:
+        """
+        Estimated time saved by skipping images.
+        Detection time of skipped images is extrapolated per pixel from detected images.
+        Returns None when no image was detected to extrapolate from.
+        """
+        if self.detected_pixels == 0:
+            return None
+        per_pixel = self.detect_seconds / self.detected_pixels
+        return self.skipped_pixels * per_pixel - self.prefilter_seconds
@@ -0,0 +1,385 @@
+from pathlib import Path
+from os import makedirs, open as os_open, close, write, replace, remove, getpid, utime
+from os import O_CREAT, O_EXCL, O_WRONLY
+from os.path import relpath
+from typing import List, Dict, Tuple, Optional
+from argparse import ArgumentParser
+from multiprocessing import Process
+from threading import Thread, Event
+from socket import gethostname
+from shutil import rmtree
+from time import time, sleep, perf_counter
+from uuid import uuid4
+import json
+import sys
+from process import process_one
+
+
+def write_manifest(source_folder: Path, work_folder: Path) -> int:
+    """
+    Writes paths of all images from source folder into a manifest, one per line.
+    Paths are relative to the work folder, so nodes can mount the shared filesystem anywhere.
+    """
+    assert source_folder.is_dir()
+
+    sources = sorted(
+        relpath(source.resolve(), work_folder.resolve())
+        for source in source_folder.iterdir()
+    )
+    work_folder.joinpath("manifest.txt").write_text(
+        "".join(f"{source}\n" for source in sources)
+    )
+    return len(sources)
+
+
+def read_manifest(work_folder: Path) -> List[str]:
+    """
+    Reads image paths, relative to the work folder, from a manifest.
+    """
+    manifest = work_folder.joinpath("manifest.txt").read_text()
+    return [line for line in manifest.splitlines() if line]
+
+
+def lock_path(work_folder: Path, index: int, generation: int) -> Path:
+    """
+    Path of a lock file of a manifest entry.
+    """
+    return work_folder.joinpath("locks", f"{index}.{generation}")
+
+
+def lock_generation(work_folder: Path, index: int) -> int:
+    """
+    Latest lock generation of a manifest entry, -1 when it was never claimed.
+    """
+    generation = -1
+    while lock_path(work_folder, index, generation + 1).exists():
+        generation += 1
+    return generation
+
+
+def claim(work_folder: Path, index: int, worker: str, lease: float) -> Optional[int]:
+    """
+    Tries to claim a manifest entry by exclusively creating its next lock generation.
+    Lock older than the lease is considered abandoned and can be taken over.
+    Returns the claimed generation, or None when the entry is done or owned by another worker.
+    """
+    if work_folder.joinpath("done", str(index)).exists():
+        return None
+
+    generation = lock_generation(work_folder, index)
+    if generation >= 0:
+        try:
+            age = time() - lock_path(work_folder, index, generation).stat().st_mtime
+        except FileNotFoundError:
+            return None
+        if age < lease:
+            return None
+
+    # Only one worker can create the next generation
+    try:
+        fd = os_open(
+            lock_path(work_folder, index, generation + 1), O_CREAT | O_EXCL | O_WRONLY
+        )
+    except FileExistsError:
+        return None
+    write(fd, worker.encode())
+    close(fd)
+    return generation + 1
+
+
+def owns(work_folder: Path, index: int, generation: int) -> bool:
+    """
+    Whether a lock generation was not taken over by another worker.
+    """
+    return not lock_path(work_folder, index, generation + 1).exists()
+
+
+def renew(work_folder: Path, index: int, generation: int, lease: float, stop: Event):
+    """
+    Keeps refreshing the lock until stopped, so long running entries are not taken over.
+    """
+    while not stop.wait(lease / 4):
+        try:
+            utime(lock_path(work_folder, index, generation))
+        except FileNotFoundError:
+            return
+
+
+def release(work_folder: Path, index: int, generation: int, result: dict) -> bool:
+    """
+    Records the result and marks a manifest entry as done, if the lock is still owned.
+    Lock files are kept, removing them would allow an entry to be claimed again.
+    """
+    done = work_folder.joinpath("done", str(index))
+    if not owns(work_folder, index, generation) or done.exists():
+        return False
+
+    results = work_folder.joinpath("results", f"{result['worker']}.jsonl")
+    with open(results, "a") as file:
+        file.write(json.dumps(result) + "\n")
+    done.touch()
+    return True
+
+
+def process_entry(
+    work_folder: Path, source: str, worker: str
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Performs detection on a single manifest entry.
+    Returns destination relative to the work folder, or the error when detection failed.
+    """
+    destination = Path("output").joinpath(Path(source).name)
+    absolute = work_folder.joinpath(destination)
+
+    # Process into a worker-specific file, in case of a taken over lease
+    temporary = absolute.with_name(f"{absolute.stem}.{worker}{absolute.suffix}")
+    try:
+        if temporary.exists():
+            remove(temporary)
+        process_one(work_folder.joinpath(source), temporary)
+        replace(temporary, absolute)
+    except Exception as error:
+        if temporary.exists():
+            remove(temporary)
+        return None, f"{type(error).__name__}: {error}"
+    return str(destination), None
+
+
+def process_shard(
+    work_folder: Path,
+    worker_index: int,
+    workers: int,
+    lease: float = 600.0,
+    poll: float = 1.0,
+) -> int:
+    """
+    Processes manifest entries until all of them are done.
+    Worker starts from its own shard of the manifest, then steals unclaimed entries from other shards.
+    Entries locked by other workers are retried once their lease expires.
+    Entries which fail are marked done with an error.
+    Returns how many entries failed in this worker.
+    """
+    assert 0 <= worker_index < workers
+
+    sources = read_manifest(work_folder)
+    run = work_folder.joinpath("run.txt").read_text()
+    worker = f"{gethostname()}-{getpid()}-{worker_index}"
+    failed = 0
+
+    # Rotate the manifest so each worker starts from its own shard
+    start = worker_index * len(sources) // workers
+    pending = list(range(start, len(sources))) + list(range(start))
+
+    while pending:
+        for index in pending:
+            generation = claim(work_folder, index, worker, lease)
+            if generation is None:
+                continue
+
+            # Renew the lease while processing
+            stop = Event()
+            renewal = Thread(
+                target=renew, args=[work_folder, index, generation, lease, stop]
+            )
+            renewal.start()
+            begin = perf_counter()
+            destination, error = process_entry(work_folder, sources[index], worker)
+            seconds = perf_counter() - begin
+            stop.set()
+            renewal.join()
+
+            result = {
+                "run": run,
+                "index": index,
+                "source": sources[index],
+                "destination": destination,
+                "error": error,
+                "worker": worker,
+                "seconds": seconds,
+            }
+            if not release(work_folder, index, generation, result):
+                continue
+            if error is None:
+                print(
+                    f"Worker {worker} processed {index + 1}/{len(sources)}: {destination}"
+                )
+            else:
+                failed += 1
+                print(f"Worker {worker} failed {index + 1}/{len(sources)}: {error}")
+
+        pending = [
+            index
+            for index in pending
+            if not work_folder.joinpath("done", str(index)).exists()
+        ]
+        if pending:
+            sleep(poll)
+
+    return failed
+
+
+def folders_overlap(folder: Path, other_folder: Path) -> bool:
+    """
+    Whether two folders are the same or one is inside the other.
+    """
+    folder = folder.resolve()
+    other_folder = other_folder.resolve()
+    return (
+        folder == other_folder
+        or folder in other_folder.parents
+        or other_folder in folder.parents
+    )
+
+
+def prepare(source_folder: Path, work_folder: Path) -> int:
+    """
+    Creates a fresh shared work folder layout and the manifest.
+    Source folder must not overlap with the work folder, which is removed first.
+    """
+    if not source_folder.is_dir():
+        raise ValueError(f"Source folder {source_folder} does not exist")
+    if folders_overlap(source_folder, work_folder):
+        raise ValueError(
+            f"Source folder {source_folder} overlaps with work folder {work_folder}"
+        )
+
+    if work_folder.exists():
+        rmtree(work_folder)
+    for folder in ["locks", "done", "results", "output"]:
+        makedirs(work_folder.joinpath(folder))
+    work_folder.joinpath("run.txt").write_text(uuid4().hex)
+    return write_manifest(source_folder, work_folder)
+
+
+def merge_results(work_folder: Path) -> Tuple[Path, int, int]:
+    """
+    Merges per-shard result files of the current run into a single one, ordered by manifest index.
+    Returns the merged file, how many entries failed and how many have no result.
+    """
+    run = work_folder.joinpath("run.txt").read_text()
+    merged: Dict[int, dict] = {}
+    for shard in sorted(work_folder.joinpath("results").glob("*.jsonl")):
+        for line in shard.read_text().splitlines():
+            if line:
+                result = json.loads(line)
+                if result["run"] == run:
+                    merged.setdefault(result["index"], result)
+
+    destination = work_folder.joinpath("results.jsonl")
+    destination.write_text(
+        "".join(json.dumps(merged[index]) + "\n" for index in sorted(merged))
+    )
+    failed = sum(1 for result in merged.values() if result["error"] is not None)
+    missing = len(read_manifest(work_folder)) - len(merged)
+    return destination, failed, missing
+
+
+def process_local(
+    source_folder: Path, work_folder: Path, workers: int, lease: float = 600.0
+) -> Tuple[Path, int, int, int]:
+    """
+    Runs many worker processes on this machine standing in for separate nodes.
+    Returns how many workers crashed, the merged file, how many entries failed and how many have no result.
+    """
+    prepare(source_folder, work_folder)
+    handles = [
+        Process(target=process_shard, args=[work_folder, i, workers, lease])
+        for i in range(workers)
+    ]
+    for handle in handles:
+        handle.start()
+    for handle in handles:
+        handle.join()
+    crashed = sum(1 for handle in handles if handle.exitcode != 0)
+    return (crashed, *merge_results(work_folder))
+
+
+def print_summary(merged: Path, failed: int, missing: int):
+    """
+    Displays the merged results file and problems found while merging.
+    """
+    print(f"Merged results: {merged}")
+    if failed > 0:
+        print(f"Failed images: {failed}")
+    if missing > 0:
+        print(f"Images without result: {missing}")
+
+
+if __name__ == "__main__":
+    # Argument parsing
+    parser = ArgumentParser(
+        "Pringles logo detector shards",
+        description="Splits detection of a manifest of images across many workers sharing a filesystem.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    prepare_parser = commands.add_parser(
+        "prepare", help="Create a fresh work folder and manifest."
+    )
+    prepare_parser.add_argument("source_folder", help="Folder with input images.")
+    prepare_parser.add_argument(
+        "work_folder", help="Shared work folder, its previous contents are removed."
+    )
+
+    work_parser = commands.add_parser("work", help="Run a single worker.")
+    work_parser.add_argument("work_folder", help="Shared work folder.")
+    work_parser.add_argument("worker", type=int, help="Index of this worker.")
+    work_parser.add_argument("workers", type=int, help="Total number of workers.")
+    work_parser.add_argument(
+        "-l",
+        "--lease",
+        default=600.0,
+        type=float,
+        help="Seconds without renewal after which a claimed image can be taken over by another worker.",
+    )
+
+    merge_parser = commands.add_parser("merge", help="Merge per-shard results.")
+    merge_parser.add_argument("work_folder", help="Shared work folder.")
+
+    local_parser = commands.add_parser(
+        "local", help="Prepare, run many local workers and merge."
+    )
+    local_parser.add_argument("source_folder", help="Folder with input images.")
+    local_parser.add_argument(
+        "work_folder", help="Shared work folder, its previous contents are removed."
+    )
+    local_parser.add_argument("workers", type=int, help="Number of worker processes.")
+    local_parser.add_argument(
+        "-l",
+        "--lease",
+        default=600.0,
+        type=float,
+        help="Seconds without renewal after which a claimed image can be taken over by another worker.",
+    )
+
+    args = parser.parse_args()
+    if args.command in ["prepare", "local"]:
+        if not Path(args.source_folder).is_dir():
+            parser.error("source folder does not exist")
+        if folders_overlap(Path(args.source_folder), Path(args.work_folder)):
+            parser.error("source folder must not be, contain or be inside work folder")
+
+    if args.command == "prepare":
+        total = prepare(Path(args.source_folder), Path(args.work_folder))
+        print(f"Manifest with {total} images written")
+    elif args.command == "work":
+        if not 0 <= args.worker < args.workers:
+            parser.error("worker index must satisfy 0 <= worker < workers")
+        failed = process_shard(
+            Path(args.work_folder), args.worker, args.workers, args.lease
+        )
+        sys.exit(1 if failed > 0 else 0)
+    elif args.command == "merge":
+        merged, failed, missing = merge_results(Path(args.work_folder))
+        print_summary(merged, failed, missing)
+        sys.exit(1 if failed > 0 or missing > 0 else 0)
+    elif args.command == "local":
+        if args.workers < 1:
+            parser.error("at least 1 worker is required")
+        crashed, merged, failed, missing = process_local(
+            Path(args.source_folder), Path(args.work_folder), args.workers, args.lease
+        )
+        print_summary(merged, failed, missing)
+        if crashed > 0:
+            print(f"Crashed workers: {crashed}")
+        sys.exit(1 if crashed > 0 or failed > 0 or missing > 0 else 0)